@@ -1,11 +1,21 @@
+import io
 import os
 import sys
+import time
+import gzip
+import random
+import shutil
+import zipfile
 import threading
-import pandas as pd
-import ccxt
-import gc
+import numpy as np
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import asynccontextmanager
-from fastapi import FastAPI, Query
+from fastapi import FastAPI, Query, Request, Response
+from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import FileResponse
 
@@ -15,11 +25,20 @@ sys.stdout.reconfigure(line_buffering=True)
 # --- Configuration ---
 DATA_DIR = "/app/data/"
 TIMEFRAME = '1m'
+BINANCE_KLINES_URL = 'https://api.binance.com/api/v3/klines'
+BINANCE_VISION_URL = ('https://data.binance.vision/data/spot/monthly/klines/'
+                      '{sym}/1m/{sym}-1m-{year}-{month:02d}.zip')
+WINDOW_MS = 1000 * 60 * 1000  # 1000 bars per request
 SINCE_STR = '2020-01-01 00:00:00'
 END_STR = '2026-01-01 00:00:00'
 
 # Timeframes to pre-generate
 DERIVED_TFS = ['5m', '15m', '1h', '4h', '1d']
+BUCKET_MS = {
+    '5m': 300_000, '15m': 900_000,
+    '1h': 3_600_000, '4h': 14_400_000,
+    '1d': 86_400_000,
+}
 
 SYMBOLS = [
     "BTC/USDT", "ETH/USDT", "XRP/USDT", "SOL/USDT", "DOGE/USDT",
@@ -33,7 +52,67 @@ SYMBOL_SLUGS = {
 }
 
 os.makedirs(DATA_DIR, exist_ok=True)
-exchange = ccxt.binance({'enableRateLimit': True})
+
+def parse_utc_ms(value: str) -> int:
+    dt = datetime.strptime(value, '%Y-%m-%d %H:%M:%S').replace(tzinfo=timezone.utc)
+    return int(dt.timestamp() * 1000)
+
+def iso_utc(ms: int) -> str:
+    return datetime.fromtimestamp(ms / 1000, tz=timezone.utc).strftime('%Y-%m-%dT%H:%M:%S')
+
+SINCE_MS = parse_utc_ms(SINCE_STR)
+END_MS = parse_utc_ms(END_STR)
+
+# One session for all Binance traffic: keep-alive reuses the TLS connection
+# across the thousands of window/archive requests instead of handshaking
+# each time.
+session = requests.Session()
+session.headers.update({'User-Agent': 'ohlcendpoint/1.0'})
+session.mount('https://', HTTPAdapter(
+    pool_connections=4, pool_maxsize=16,
+    max_retries=Retry(total=5, backoff_factor=0.5)))
+
+BINANCE_WEIGHT_LIMIT = 1200  # request-weight budget per rolling minute
+_weight_lock = threading.Lock()
+_weight_used = 0
+_weight_window = 0
+
+def throttled_get(url: str, params=None, timeout=10, weight=2):
+    """session.get gated by Binance's per-minute request-weight budget.
+
+    Spend is tracked locally across all worker threads, corrected
+    upward from the X-MBX-USED-WEIGHT-1M response header, and 418/429
+    responses honor Retry-After with jittered exponential backoff
+    instead of a blind fixed sleep.
+    """
+    global _weight_used, _weight_window
+    backoff = 1.0
+    while True:
+        with _weight_lock:
+            window = int(time.time() // 60)
+            if window != _weight_window:
+                _weight_window, _weight_used = window, 0
+            if _weight_used + weight <= BINANCE_WEIGHT_LIMIT:
+                _weight_used += weight
+                wait = 0.0
+            else:
+                wait = 60 - time.time() % 60
+        if wait:
+            time.sleep(wait + random.uniform(0, 0.5))
+            continue
+        r = session.get(url, params=params, timeout=timeout)
+        used = r.headers.get('x-mbx-used-weight-1m', '')
+        if used.isdigit():
+            with _weight_lock:
+                if int(time.time() // 60) == _weight_window:
+                    _weight_used = max(_weight_used, int(used))
+        if r.status_code in (418, 429):
+            retry_after = float(r.headers.get('Retry-After', backoff))
+            print(f"Rate limited ({r.status_code}); backing off {retry_after:.0f}s")
+            time.sleep(retry_after + random.uniform(0, backoff))
+            backoff = min(backoff * 2, 60)
+            continue
+        return r
 
 # --- Helper Functions ---
 
@@ -43,171 +122,364 @@ def get_filename(symbol_slug: str, timeframe: str) -> str:
 def get_file_path(filename: str) -> str:
     return os.path.join(DATA_DIR, filename)
 
-def is_file_complete(file_path: str, target_end_ms: int) -> bool:
+# Request validation runs per hit; build the lookups once.
+ALL_TFS = ('1m', *DERIVED_TFS)
+ALLOWED_TFS = frozenset(ALL_TFS)
+FILE_PATHS = {(slug, tf): get_file_path(get_filename(slug, tf))
+              for slug in SYMBOL_SLUGS.values() for tf in ALL_TFS}
+
+def read_last_line(file_path: str) -> bytes:
+    """Last line of a file, via a fixed 128-byte backward seek."""
+    with open(file_path, 'rb') as f:
+        try:
+            f.seek(-128, 2)
+        except OSError:
+            f.seek(0)
+        buf = f.read()
+    i = buf.rfind(b'\n', 0, len(buf) - 1)
+    return buf[i + 1:].rstrip()
+
+def get_last_timestamp(file_path: str):
+    """Last bar timestamp in a CSV, or None for missing/header-only files."""
+    try:
+        last = read_last_line(file_path)
+        return int(last[:last.index(b',')])
+    except (OSError, ValueError):
+        return None
+
+def drop_last_line(file_path: str):
+    """Remove the final line of a file in place."""
+    with open(file_path, 'rb+') as f:
+        try:
+            f.seek(-1024, 2)
+        except OSError:
+            f.seek(0)
+        pos = f.tell()
+        tail = f.read()
+        cut = tail.rfind(b'\n', 0, len(tail) - 1)
+        f.truncate(pos + cut + 1)
+
+CSV_HEADER = 'timestamp,open,high,low,close,volume\n'
+
+def repair_partial_tail(file_path: str):
+    """Truncate a final line left incomplete by a crash mid-append.
+
+    A restart can cut the buffered 1m writer anywhere, and a fragment cut
+    after the first comma still tail-parses as a valid timestamp, so a
+    blind append would merge the first new row onto it. Drop anything
+    that doesn't end in a newline with a full complement of fields.
+    """
     try:
-        if not os.path.exists(file_path) or os.path.getsize(file_path) < 100:
-            return False
         with open(file_path, 'rb') as f:
-            try:
-                f.seek(-1024, 2)
-            except OSError:
-                f.seek(0)
-            lines = f.readlines()
-            if not lines: return False
-            last_line = lines[-1].decode().strip()
-            if not last_line: return False
-            last_ts = int(last_line.split(',')[0])
-            # 2 min tolerance
-            return last_ts >= (target_end_ms - 120000)
-    except Exception:
+            f.seek(-1, 2)
+            ends_with_newline = f.read() == b'\n'
+    except OSError:
+        return
+    if not ends_with_newline or read_last_line(file_path).count(b',') != CSV_HEADER.count(','):
+        drop_last_line(file_path)
+
+def has_current_header(file_path: str) -> bool:
+    try:
+        with open(file_path, 'rb') as f:
+            return f.readline() == CSV_HEADER.encode()
+    except OSError:
         return False
 
-def append_to_csv(file_path: str, data: list):
-    if not data: return
-    df = pd.DataFrame(data, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
-    df['datetime'] = pd.to_datetime(df['timestamp'], unit='ms')
-    df.to_csv(file_path, mode='a', header=False, index=False)
-    del df
-    gc.collect()
-
-def create_new_csv(file_path: str, data: list):
-    if not data: return
-    df = pd.DataFrame(data, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
-    df['datetime'] = pd.to_datetime(df['timestamp'], unit='ms')
-    df.to_csv(file_path, mode='w', header=True, index=False)
-    print(f"[{os.path.basename(file_path)}] Created new file with {len(df)} rows.")
-    del df
-    gc.collect()
+def compress_file(file_path: str):
+    """Refresh the .gz sibling so downloads skip per-request compression.
+
+    Compressed to a temp path and swapped in with os.replace so readers
+    never see a half-written archive; an existing .gz is always whole.
+    """
+    gz_path = file_path + '.gz'
+    tmp_path = gz_path + '.tmp'
+    with open(file_path, 'rb') as src, gzip.open(tmp_path, 'wb', compresslevel=3) as dst:
+        shutil.copyfileobj(src, dst, 1024 * 1024)
+    os.replace(tmp_path, gz_path)
+
+def write_rows(f, rows):
+    if len(rows) == 0: return
+    f.writelines(
+        f"{int(row[0])},{row[1]},{row[2]},{row[3]},{row[4]},{row[5]}\n"
+        for row in rows)
+
+def fetch_klines(symbol: str, start_ms: int, end_ms: int) -> list:
+    """One /api/v3/klines window -> [ts, o, h, l, c, v] rows.
+
+    Prices and volume stay as the decimal strings Binance sends; the
+    writer emits them verbatim, so there's no float parse or reformat
+    between the API and the CSV.
+    """
+    params = {
+        'symbol': symbol.replace('/', ''),
+        'interval': TIMEFRAME,
+        'startTime': start_ms,
+        'endTime': end_ms - 1,
+        'limit': 1000,
+    }
+    r = throttled_get(BINANCE_KLINES_URL, params=params, timeout=10, weight=2)
+    r.raise_for_status()
+    return [[int(k[0]), k[1], k[2], k[3], k[4], k[5]] for k in r.json()]
+
+def fetch_window(symbol: str, start_ms: int, end_ms: int) -> list:
+    while True:
+        try:
+            return fetch_klines(symbol, start_ms, end_ms)
+        except Exception as e:
+            print(f"Retrying {symbol}: {e}")
+            time.sleep(5)
+
+def month_windows(start_ms: int, end_ms: int):
+    """Yield (month_start_ms, month_end_ms) for every month touching [start_ms, end_ms)."""
+    dt = datetime.fromtimestamp(start_ms / 1000, tz=timezone.utc).replace(
+        day=1, hour=0, minute=0, second=0, microsecond=0)
+    while int(dt.timestamp() * 1000) < end_ms:
+        if dt.month == 12:
+            nxt = dt.replace(year=dt.year + 1, month=1)
+        else:
+            nxt = dt.replace(month=dt.month + 1)
+        yield int(dt.timestamp() * 1000), int(nxt.timestamp() * 1000)
+        dt = nxt
+
+def fetch_month(symbol: str, year: int, month: int):
+    """Rows from one monthly archive, or None if it isn't published (404)."""
+    sym = symbol.replace('/', '')
+    url = BINANCE_VISION_URL.format(sym=sym, year=year, month=month)
+    r = session.get(url, timeout=60)
+    if r.status_code == 404:
+        return None
+    r.raise_for_status()
+    rows = []
+    with zipfile.ZipFile(io.BytesIO(r.content)) as zf:
+        with zf.open(zf.namelist()[0]) as member:
+            for line in io.TextIOWrapper(member, newline=''):
+                parts = line.split(',')
+                if not parts[0].isdigit():  # newer archives carry a header row
+                    continue
+                ts = int(parts[0])
+                if ts >= 10**14:  # archives from 2025 on use microseconds
+                    ts //= 1000
+                rows.append([ts, parts[1], parts[2], parts[3], parts[4], parts[5]])
+    return rows
+
+def fetch_span(symbol: str, month_start_ms: int, start_ms: int, end_ms: int,
+               use_archive: bool) -> list:
+    """Rows for one month's slice [start_ms, end_ms) of a symbol."""
+    if use_archive:
+        dt = datetime.fromtimestamp(month_start_ms / 1000, tz=timezone.utc)
+        while True:
+            try:
+                rows = fetch_month(symbol, dt.year, dt.month)
+                break
+            except Exception as e:
+                print(f"Retrying {symbol} {dt.year}-{dt.month:02d}: {e}")
+                time.sleep(5)
+        if rows is not None:
+            return [row for row in rows if start_ms <= row[0] < end_ms]
+    # Archive missing (delisted gap, or not yet published): page through REST.
+    out = []
+    for w in range(start_ms, end_ms, WINDOW_MS):
+        out.extend(fetch_window(symbol, w, min(w + WINDOW_MS, end_ms)))
+    return out
+
+def sync_range(f, filename: str, symbol: str, start_ms: int, end_ms: int):
+    """Fill [start_ms, end_ms): one bulk archive per closed month, REST windows
+    for the current month, fetched in parallel per month.
+
+    One monthly ZIP replaces ~44 paginated klines calls; executor.map keeps
+    the rows arriving in order for the streaming writer.
+    """
+    now_ms = time.time_ns() // 1_000_000
+    spans = []
+    for m_start, m_end in month_windows(start_ms, end_ms):
+        # archives appear a couple of days after the month closes
+        use_archive = m_end <= now_ms - 2 * 86_400_000
+        spans.append((m_start, max(m_start, start_ms), min(m_end, end_ms), use_archive))
+    rows_since_log = 0
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        for rows in executor.map(lambda s: fetch_span(symbol, *s), spans):
+            write_rows(f, rows)
+            rows_since_log += len(rows)
+            if len(rows) and rows_since_log >= 50000:
+                print(f"[{filename}] ... {iso_utc(int(rows[-1][0]))}")
+                rows_since_log = 0
+
+def resample_ohlcv(ts, o, h, l, c, v, bucket_ms: int):
+    """Aggregate 1m bars into bucket_ms buckets in one pass over the arrays.
+
+    Buckets are keyed by ts // bucket_ms; timestamp/open come from the first
+    bar in the bucket, high/low are max/min, close is the last bar, volume
+    is summed. Empty buckets simply never appear.
+    """
+    if ts.size == 0:
+        return ts, o, h, l, c, v
+    buckets = ts // bucket_ms
+    starts = np.flatnonzero(buckets[1:] != buckets[:-1]) + 1
+    starts = np.concatenate(([0], starts))
+    last = np.concatenate((starts[1:], [ts.size])) - 1
+    return (ts[starts], o[starts],
+            np.maximum.reduceat(h, starts),
+            np.minimum.reduceat(l, starts),
+            c[last],
+            np.add.reduceat(v, starts))
+
+def load_base_arrays(base_file_path: str):
+    """Typed columns of the 1m file, cached as a binary .npy sidecar.
+
+    Parsing millions of rows of CSV text dominates derived-file
+    generation; the sidecar makes every re-read after the first a raw
+    array load. Refreshed whenever the CSV is newer than the cache.
+    """
+    cache_path = base_file_path[:-4] + '.npy'
+    try:
+        if os.path.getmtime(cache_path) >= os.path.getmtime(base_file_path):
+            # Map instead of read: the resampler only scans the columns once,
+            # so paging straight out of the page cache avoids materializing
+            # a second full copy of the history per symbol.
+            arr = np.load(cache_path, mmap_mode='r')
+            return (np.asarray(arr[:, 0], dtype=np.int64), arr[:, 1], arr[:, 2],
+                    arr[:, 3], arr[:, 4], arr[:, 5])
+    except (OSError, ValueError):
+        # Missing, stale or unreadable sidecar: fall through to the CSV
+        # parse, which rewrites it.
+        pass
+
+    import pandas as pd  # deferred: only the cold-cache parse needs it
+    df = pd.read_csv(
+        base_file_path,
+        usecols=['timestamp', 'open', 'high', 'low', 'close', 'volume'],
+        dtype={'timestamp': 'int64', 'open': 'float64', 'high': 'float64',
+               'low': 'float64', 'close': 'float64', 'volume': 'float64'},
+    )
+    arr = np.column_stack([
+        df['timestamp'].to_numpy(np.float64),
+        df['open'].to_numpy(np.float64),
+        df['high'].to_numpy(np.float64),
+        df['low'].to_numpy(np.float64),
+        df['close'].to_numpy(np.float64),
+        df['volume'].to_numpy(np.float64),
+    ])
+    # Same temp-and-replace dance as compress_file: a save cut short by a
+    # restart must not leave a fresh-looking but truncated sidecar behind.
+    tmp_path = cache_path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        np.save(f, arr)
+    os.replace(tmp_path, cache_path)
+    return (arr[:, 0].astype(np.int64), arr[:, 1], arr[:, 2],
+            arr[:, 3], arr[:, 4], arr[:, 5])
 
 def generate_derived_files(symbol_slug: str, base_file_path: str):
     """Loads 1m file and generates 5m, 1h, etc."""
     print(f"[{symbol_slug}] Generating derived timeframes...")
-    
+
     if not os.path.exists(base_file_path):
         print(f"[{symbol_slug}] Base file missing. Skipping derived.")
         return
 
     # Load Base
     try:
-        df = pd.read_csv(base_file_path)
-        df['datetime'] = pd.to_datetime(df['timestamp'], unit='ms')
-        df.set_index('datetime', inplace=True)
+        ts, o, h, l, c, v = load_base_arrays(base_file_path)
     except Exception as e:
         print(f"[{symbol_slug}] Error reading base file: {e}")
         return
 
-    tf_map = {
-        '5m': '5min', '15m': '15min', 
-        '1h': '1h', '4h': '4h', 
-        '1d': '1D'
-    }
-
-    agg_dict = {
-        'timestamp': 'first', # Start of bucket
-        'open': 'first',
-        'high': 'max',
-        'low': 'min',
-        'close': 'last',
-        'volume': 'sum'
-    }
+    if ts.size == 0:
+        print(f"[{symbol_slug}] Base file empty. Skipping derived.")
+        return
 
-    for tf in DERIVED_TFS:
+    def generate_one(tf: str):
         target_file = get_file_path(get_filename(symbol_slug, tf))
-        rule = tf_map.get(tf)
-        
+        bucket_ms = BUCKET_MS[tf]
+
         try:
-            # Resample
-            resampled = df.resample(rule).agg(agg_dict)
-            resampled.dropna(inplace=True)
-            
-            # Fix timestamp (ensure it's int)
-            resampled['timestamp'] = resampled['timestamp'].astype('int64')
-            
-            # Save
-            cols = ['timestamp', 'open', 'high', 'low', 'close', 'volume']
-            resampled[cols].to_csv(target_file, index=False)
-            print(f"[{symbol_slug}] -> Generated {tf}")
-            
-            del resampled
+            last_ts = get_last_timestamp(target_file)
+            if last_ts is None:
+                start, mode = 0, 'w'
+            else:
+                # Buckets before the last one are immutable; recompute only
+                # from the start of the (possibly partial) final bucket.
+                start = int(np.searchsorted(ts, (last_ts // bucket_ms) * bucket_ms))
+                if start >= ts.size:
+                    print(f"[{symbol_slug}] -> {tf} already up to date")
+                    return
+                drop_last_line(target_file)
+                mode = 'a'
+
+            ts2, o2, h2, l2, c2, v2 = resample_ohlcv(
+                ts[start:], o[start:], h[start:], l[start:], c[start:], v[start:], bucket_ms)
+            with open(target_file, mode, buffering=1024*1024, newline='') as f:
+                if mode == 'w':
+                    f.write(CSV_HEADER)
+                # One join + write per 64k-row batch beats per-line writes.
+                for lo in range(0, ts2.size, 1 << 16):
+                    hi = min(lo + (1 << 16), ts2.size)
+                    f.write(''.join(
+                        f"{ts2[i]},{o2[i]},{h2[i]},{l2[i]},{c2[i]},{v2[i]}\n"
+                        for i in range(lo, hi)))
+            compress_file(target_file)
+            print(f"[{symbol_slug}] -> {'Generated' if mode == 'w' else 'Updated'} {tf}")
         except Exception as e:
             print(f"[{symbol_slug}] Failed to generate {tf}: {e}")
-            
-    del df
-    gc.collect()
 
-def fetch_worker():
-    print("--- STRICT SYNC STARTED ---")
-    
-    target_start_ms = exchange.parse8601(SINCE_STR)
-    target_end_ms = exchange.parse8601(END_STR)
+    # The five timeframes share the read-only base arrays and write
+    # independent files, so run them together.
+    with ThreadPoolExecutor(max_workers=len(DERIVED_TFS)) as executor:
+        list(executor.map(generate_one, DERIVED_TFS))
+
+def sync_symbol(symbol: str):
+    target_start_ms = SINCE_MS
+    target_end_ms = END_MS
     duration_ms = 60 * 1000
 
-    for symbol in SYMBOLS:
-        slug = SYMBOL_SLUGS[symbol]
-        filename = get_filename(slug, '1m')
-        file_path = get_file_path(filename)
-        
-        # 1. Check/Sync Base File
-        needs_sync = False
-        
-        if is_file_complete(file_path, target_end_ms):
-            print(f"[{filename}] COMPLETE. Checking derived...")
-        else:
-            needs_sync = True
-            if os.path.exists(file_path):
-                print(f"[{filename}] INCOMPLETE. Deleting...")
-                try:
-                    os.remove(file_path)
-                except OSError: pass
+    slug = SYMBOL_SLUGS[symbol]
+    filename = get_filename(slug, '1m')
+    file_path = get_file_path(filename)
 
+    # 1. Check/Sync Base File
+    needs_sync = False
+
+    # One tail read answers both "is it complete?" and "where to resume?".
+    # Files from before the datetime column was dropped get rewritten
+    # rather than appended to with a narrower row, and a partial last
+    # line from an interrupted run is truncated before we trust it.
+    if has_current_header(file_path):
+        repair_partial_tail(file_path)
+        last_ts = get_last_timestamp(file_path)
+    else:
+        last_ts = None
+
+    if last_ts is not None and last_ts >= target_end_ms - 120000:  # 2 min tolerance
+        print(f"[{filename}] COMPLETE. Checking derived...")
+    else:
+        needs_sync = True
+        if last_ts is not None:
+            print(f"[{filename}] INCOMPLETE. Resuming from {iso_utc(last_ts)}...")
+            current_since = last_ts + duration_ms
+            mode = 'a'
+        else:
             print(f"[{filename}] Starting download...")
             current_since = target_start_ms
-            batch_data = []
-            mode = 'write'
-            
-            while current_since < target_end_ms:
-                try:
-                    ohlcv = exchange.fetch_ohlcv(symbol, TIMEFRAME, since=current_since, limit=1000)
-                    if not ohlcv:
-                        current_since += (1000 * duration_ms)
-                        if current_since >= target_end_ms: break
-                        continue
-
-                    ohlcv = [x for x in ohlcv if x[0] < target_end_ms]
-                    if not ohlcv: break
-
-                    batch_data.extend(ohlcv)
-                    current_since = ohlcv[-1][0] + duration_ms
-                    
-                    if len(batch_data) >= 50000:
-                        if mode == 'write':
-                            create_new_csv(file_path, batch_data)
-                            mode = 'append'
-                        else:
-                            append_to_csv(file_path, batch_data)
-                        print(f"[{filename}] ... {exchange.iso8601(current_since)}")
-                        batch_data = []
-                        gc.collect()
-
-                except Exception as e:
-                    print(f"Retrying {symbol}: {e}")
-                    import time; time.sleep(5)
-
-            if batch_data:
-                if mode == 'write': create_new_csv(file_path, batch_data)
-                else: append_to_csv(file_path, batch_data)
-            
-            del batch_data
-            gc.collect()
-
-        # 2. Generate Derived Files
-        # We regenerate if main file was synced OR if a specific derived file is missing
-        derived_missing = any(not os.path.exists(get_file_path(get_filename(slug, tf))) for tf in DERIVED_TFS)
-        
-        if needs_sync or derived_missing:
-            generate_derived_files(slug, file_path)
-        else:
-            print(f"[{slug}] All files up to date.")
+            mode = 'w'
+        with open(file_path, mode, buffering=1024*1024, newline='') as f:
+            if mode == 'w':
+                f.write(CSV_HEADER)
+            sync_range(f, filename, symbol, current_since, target_end_ms)
+        compress_file(file_path)
+
+    # 2. Generate Derived Files
+    # We regenerate if main file was synced OR if a specific derived file is missing
+    derived_missing = any(not os.path.exists(get_file_path(get_filename(slug, tf))) for tf in DERIVED_TFS)
+
+    if needs_sync or derived_missing:
+        generate_derived_files(slug, file_path)
+    else:
+        print(f"[{slug}] All files up to date.")
+
+def fetch_worker():
+    print("--- STRICT SYNC STARTED ---")
+
+    with ThreadPoolExecutor(max_workers=6) as executor:
+        list(executor.map(sync_symbol, SYMBOLS))
 
     print("--- ALL FILES SYNCED ---")
 
@@ -215,11 +487,15 @@ def fetch_worker():
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    thread = threading.Thread(target=fetch_worker, daemon=True)
-    thread.start()
+    # DISABLE_FETCH=1 runs this process as a pure file server; pair it with
+    # a dedicated `python app.py fetch` process sharing DATA_DIR.
+    if os.environ.get('DISABLE_FETCH') != '1':
+        thread = threading.Thread(target=fetch_worker, daemon=True)
+        thread.start()
     yield
 
 app = FastAPI(lifespan=lifespan)
+app.add_middleware(GZipMiddleware, minimum_size=1024)
 
 # --- Serve Files ---
 app.mount("/data", StaticFiles(directory=DATA_DIR), name="data")
@@ -235,7 +511,8 @@ def index():
     }
 
 @app.get("/export")
-def export_data(symbol: str = Query(..., description="e.g. BTC/USDT"), 
+def export_data(request: Request,
+               symbol: str = Query(..., description="e.g. BTC/USDT"),
                timeframe: str = Query("1m", description="1m, 5m, 15m, 1h, 4h, 1d")):
     
     # Normalize
@@ -247,22 +524,47 @@ def export_data(symbol: str = Query(..., description="e.g. BTC/USDT"),
     target_tf = timeframe.lower()
     
     # Validate timeframe
-    allowed = ['1m'] + DERIVED_TFS
-    if target_tf not in allowed:
-        return {"error": f"Timeframe {target_tf} not pre-generated.", "available": allowed}
+    if target_tf not in ALLOWED_TFS:
+        return {"error": f"Timeframe {target_tf} not pre-generated.", "available": list(ALL_TFS)}
 
     filename = get_filename(slug, target_tf)
-    file_path = get_file_path(filename)
+    file_path = FILE_PATHS[slug, target_tf]
     
-    if not os.path.exists(file_path):
+    try:
+        stat = os.stat(file_path)
+    except OSError:
         return {"error": "File not generated yet. Please wait for sync."}
-        
+
+    # Polling clients revalidate instead of re-downloading: the ETag only
+    # changes when the CSV does, so an If-None-Match hit is a bodyless 304.
+    etag = f'"{int(stat.st_mtime)}-{stat.st_size}"'
+    if request.headers.get('if-none-match') == etag:
+        return Response(status_code=304, headers={'ETag': etag})
+
+    # Serve the precompressed sibling when the client can take it: same CSV,
+    # ~6-10x fewer bytes, zero compression CPU per request.
+    gz_path = file_path + '.gz'
+    if ('gzip' in request.headers.get('accept-encoding', '')
+            and os.path.exists(gz_path)
+            and os.path.getmtime(gz_path) >= stat.st_mtime):
+        return FileResponse(
+            gz_path,
+            media_type='text/csv',
+            filename=filename,
+            headers={'Content-Encoding': 'gzip', 'Vary': 'Accept-Encoding',
+                     'ETag': etag}
+        )
+
     return FileResponse(
-        file_path, 
-        media_type='text/csv', 
-        filename=filename
+        file_path,
+        media_type='text/csv',
+        filename=filename,
+        headers={'ETag': etag}
     )
 
 if __name__ == "__main__":
-    import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    if len(sys.argv) > 1 and sys.argv[1] == 'fetch':
+        fetch_worker()
+    else:
+        import uvicorn
+        uvicorn.run(app, host="0.0.0.0", port=8000)